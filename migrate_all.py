@@ -0,0 +1,87 @@
+import os
+import sqlite3
+
+from migrate_common import (BIG_TABLE_ROWS, DB_PATH, NEW_DB_PATH,
+                            bulk_window_pragmas, confirm, connect_tuned,
+                            parse_args, rebuild_ewcs_data_into_fresh_file,
+                            rebuild_ewcs_data_without, record_migration,
+                            table_columns)
+from migrate_cs125_current import migrate_cs125_current
+from migrate_power_save_mode import migrate_power_save_mode
+from migrate_images import migrate_images
+
+
+def migrate_all():
+    conn = connect_tuned()
+    cursor = conn.cursor()
+
+    try:
+        doomed = [c for c in ('cs125_current', 'power_save_mode')
+                  if c in table_columns(conn, 'ewcs_data')]
+
+        use_legacy = sqlite3.sqlite_version_info < (3, 35, 0)
+        fused_done = False
+        if doomed and use_legacy:
+            cursor.execute("SELECT COUNT(*) FROM ewcs_data")
+            if cursor.fetchone()[0] > BIG_TABLE_ROWS:
+                # huge table: rebuild into a fresh attached file as a pure
+                # sequential append (outside any transaction), then swap
+                # it over data/ewcs.db before opening the bulk window
+                rebuild_ewcs_data_into_fresh_file(conn, doomed)
+                conn.close()
+                os.replace(NEW_DB_PATH, DB_PATH)
+                conn = connect_tuned()
+                cursor = conn.cursor()
+                for col in doomed:
+                    record_migration(conn, f'drop_{col}')
+                fused_done = True
+                print(f"dropped {', '.join(doomed)} via fresh-file rebuild")
+
+        # one journal-off bulk window and one transaction for everything;
+        # the connection context manager commits on success and rolls
+        # back on any exception, so there is no manual error branch
+        bulk_window_pragmas(conn)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+
+            if fused_done:
+                pass
+            elif len(doomed) == 2 and use_legacy:
+                # both column drops fuse into a single shadow-table rewrite
+                # instead of copying ewcs_data twice
+                rebuild_ewcs_data_without(cursor, doomed)
+                for col in doomed:
+                    record_migration(conn, f'drop_{col}')
+                print("dropped cs125_current and power_save_mode in one rebuild")
+            else:
+                migrate_cs125_current(conn)
+                migrate_power_save_mode(conn)
+
+            migrate_images(conn)
+
+        # back to a safe mode for the running application
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        # refresh planner statistics once for everything the run touched
+        # (oasc_images only exists once migrate_images had rows to move)
+        conn.execute("PRAGMA optimize")
+        for table in ('ewcs_data', 'ewcs_images', 'oasc_images'):
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                (table,))
+            if cursor.fetchone():
+                conn.execute(f"ANALYZE {table}")
+
+        print("all migrations applied")
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    args = parse_args("Run all ewcs.db migrations")
+    if args.yes or confirm("Run all ewcs.db migrations? (y/N): "):
+        migrate_all()
+    else:
+        print("Cancelled")
@@ -0,0 +1,313 @@
+import argparse
+import os
+import sqlite3
+import sys
+
+DB_PATH = 'data/ewcs.db'
+NEW_DB_PATH = 'data/ewcs_new.db'
+
+# rows copied per INSERT ... SELECT chunk in the legacy rebuild
+# (overridable via --batch-size)
+COPY_BATCH_SIZE = 50000
+
+# journal mode during the bulk window (overridable via --journal-mode);
+# OFF by default since a failed rebuild is simply re-run
+BULK_JOURNAL_MODE = 'OFF'
+
+# above this ewcs_data row count the legacy rebuild writes into a fresh
+# attached file instead of a shadow table, so the db file doesn't
+# transiently double in size and the result comes out defragmented
+BIG_TABLE_ROWS = 1000000
+
+# full ewcs_data schema; the legacy rebuild derives the trimmed shadow
+# table from this list so the scripts stay in sync
+EWCS_DATA_COLUMNS = [
+    ("id", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    ("timestamp", "INTEGER"),
+    ("station_name", "TEXT"),
+    ("cs125_current", "REAL"),
+    ("cs125_visibility", "INTEGER"),
+    ("cs125_synop", "INTEGER"),
+    ("cs125_temp", "REAL"),
+    ("cs125_humidity", "REAL"),
+    ("sht45_temp", "REAL"),
+    ("sht45_humidity", "REAL"),
+    ("iridium_current", "REAL"),
+    ("camera_current", "REAL"),
+    ("rpi_temp", "REAL"),
+    ("battery_voltage", "REAL"),
+    ("last_image", "TEXT"),
+    ("power_save_mode", "TEXT DEFAULT 'normal'"),
+    ("cs125_on_status", "INTEGER"),
+    ("cs125_hood_heater_status", "INTEGER"),
+    ("camera_on_status", "INTEGER"),
+    ("iridium_on_status", "INTEGER"),
+    ("power_save_on_status", "INTEGER"),
+    ("ip_address", "TEXT"),
+    ("camera_ip_address", "TEXT"),
+    ("data_save_period", "INTEGER"),
+    ("image_save_period", "INTEGER"),
+    ("created_at", "DATETIME DEFAULT CURRENT_TIMESTAMP"),
+]
+
+
+def connect_tuned():
+    """Open data/ewcs.db tuned for a bulk migration window.
+
+    isolation_level=None disables the driver's implicit transaction
+    handling, so an explicit BEGIN IMMEDIATE deterministically covers all
+    DDL+DML in one transaction. WAL + relaxed synchronous cut fsync
+    traffic on the Pi SD card.
+    """
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-200000")
+    # memory-map the file so reads of the source table skip the
+    # user/kernel copy through the pager; 256MB covers years of data and
+    # the memcpy saving is noticeable on the Pi. page_size only takes
+    # effect on a fresh file, before anything is written to it.
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA page_size=4096")
+    return conn
+
+
+def parse_args(description):
+    """Shared CLI for the migration scripts.
+
+    Besides -y for unattended runs, exposes the knobs of the bulk-copy
+    optimizations so scripted benchmarking can vary them.
+    """
+    global COPY_BATCH_SIZE, BULK_JOURNAL_MODE
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('-y', '--yes', action='store_true',
+                        help='run without the confirmation prompt')
+    parser.add_argument('--batch-size', type=int, default=COPY_BATCH_SIZE,
+                        help='rows per INSERT chunk in the legacy rebuild')
+    parser.add_argument('--journal-mode', choices=['off', 'wal'],
+                        default=BULK_JOURNAL_MODE.lower(),
+                        help='journal mode during the bulk window')
+    args = parser.parse_args()
+
+    COPY_BATCH_SIZE = args.batch_size
+    BULK_JOURNAL_MODE = args.journal_mode.upper()
+    return args
+
+
+def confirm(prompt):
+    """Prompt and read the reply straight from stdin.
+
+    Unlike input(), this pulls in no readline/TTY machinery, and a batch
+    run with stdin closed just gets '' back and aborts cleanly.
+    """
+    sys.stdout.write(prompt)
+    sys.stdout.flush()
+    return sys.stdin.readline().strip().lower() == 'y'
+
+
+def bulk_window_pragmas(conn):
+    """Journal settings for the bulk window, per --journal-mode."""
+    conn.execute(f"PRAGMA journal_mode={BULK_JOURNAL_MODE}")
+    conn.execute("PRAGMA synchronous="
+                 + ("OFF" if BULK_JOURNAL_MODE == 'OFF' else "NORMAL"))
+
+
+def _ensure_migrations_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations(
+            name TEXT PRIMARY KEY,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def migration_applied(conn, name):
+    """True when the named migration is recorded in schema_migrations.
+
+    The recorded-migration check makes re-runs O(1): no PRAGMA scans, no
+    table probes, no rebuild just because the column happens to exist.
+    """
+    _ensure_migrations_table(conn)
+    cursor = conn.execute("SELECT 1 FROM schema_migrations WHERE name = ?",
+                          (name,))
+    return cursor.fetchone() is not None
+
+
+def record_migration(conn, name):
+    """Record the migration; call inside the migration's own transaction."""
+    _ensure_migrations_table(conn)
+    conn.execute("INSERT OR IGNORE INTO schema_migrations(name) VALUES (?)",
+                 (name,))
+
+
+# cached PRAGMA table_info results keyed by (connection, table), so
+# chained migrations don't re-read sqlite_schema for every existence
+# check; anything that reshapes a table must call invalidate_table_info()
+_table_info_cache = {}
+
+
+def table_columns(conn, table):
+    key = (id(conn), table)
+    if key not in _table_info_cache:
+        cursor = conn.execute(f"PRAGMA table_info({table})")
+        _table_info_cache[key] = [row[1] for row in cursor.fetchall()]
+    return _table_info_cache[key]
+
+
+def has_column(conn, table, col):
+    return col in table_columns(conn, table)
+
+
+def invalidate_table_info(conn):
+    for key in [k for k in _table_info_cache if k[0] == id(conn)]:
+        del _table_info_cache[key]
+
+
+def _keep_columns(cursor, doomed):
+    """Columns of the live ewcs_data minus the doomed ones.
+
+    Derived from the actual table rather than EWCS_DATA_COLUMNS so a
+    rebuild still works when another migration already dropped a column.
+    """
+    decls = dict(EWCS_DATA_COLUMNS)
+    cursor.execute("PRAGMA table_info(ewcs_data)")
+    return [(row[1], decls.get(row[1], row[2]))
+            for row in cursor.fetchall() if row[1] not in doomed]
+
+
+def rebuild_ewcs_data_without(cursor, doomed, transform=None):
+    """Legacy shadow-table rebuild of ewcs_data minus the doomed columns.
+
+    Used when ALTER TABLE ... DROP COLUMN is unavailable (SQLite < 3.35).
+    All doomed columns are dropped in ONE row copy. transform, if given,
+    is called on every kept-column tuple and its result inserted instead;
+    the copy then streams through a prepared INSERT rather than pure SQL.
+    Returns True when the table was empty and the copy was skipped.
+    """
+    keep = _keep_columns(cursor, doomed)
+
+    cursor.execute("SELECT 1 FROM ewcs_data LIMIT 1")
+    table_has_rows = cursor.fetchone() is not None
+
+    cursor.execute("CREATE TABLE ewcs_data_new (\n    "
+                   + ",\n    ".join(f"{name} {decl}" for name, decl in keep)
+                   + "\n)")
+
+    # contract: the fresh table carries no indexes until the bulk copy is
+    # done, so the timestamp index is built once in a single sort pass
+    # instead of per-row B-tree inserts
+    cursor.execute("PRAGMA index_list(ewcs_data_new)")
+    extra_indexes = [row[1] for row in cursor.fetchall()
+                     if not row[1].startswith('sqlite_autoindex_')]
+    assert not extra_indexes, \
+        f"ewcs_data_new must have no indexes before the copy: {extra_indexes}"
+
+    if table_has_rows and transform is not None:
+        # row values need reshaping in Python, so pure SQL is out; stream
+        # the source cursor straight into one prepared INSERT. executemany
+        # compiles the statement once and pulls rows in chunks internally,
+        # pipelining the reads and writes
+        select_list = ", ".join(name for name, _ in keep)
+        placeholders = ", ".join("?" for _ in keep)
+        src = cursor.connection.cursor()
+        src.execute(f"SELECT {select_list} FROM ewcs_data")
+        cursor.executemany(
+            f"INSERT INTO ewcs_data_new VALUES ({placeholders})",
+            map(transform, src))
+    elif table_has_rows:
+        # copy in bounded id ranges, still inside the one transaction, so
+        # the pager can evict dirty pages incrementally instead of
+        # buffering the whole write set. The SELECT list matches
+        # ewcs_data_new positionally, like CREATE TABLE ... AS SELECT
+        # would; a real CTAS is off the table because it would lose the
+        # AUTOINCREMENT id and the created_at default the application
+        # relies on
+        select_list = ", ".join(name for name, _ in keep)
+        cursor.execute("SELECT MAX(id) FROM ewcs_data")
+        hi = cursor.fetchone()[0]
+        for lo in range(0, hi + 1, COPY_BATCH_SIZE):
+            cursor.execute(
+                f"INSERT INTO ewcs_data_new SELECT {select_list} FROM ewcs_data"
+                " WHERE id >= ? AND id < ?",
+                (lo, lo + COPY_BATCH_SIZE))
+
+    cursor.execute("DROP TABLE ewcs_data")
+    # index after the copy (and after the old index is gone with the
+    # DROP), before the rename
+    cursor.execute("CREATE INDEX idx_ewcs_data_timestamp ON ewcs_data_new(timestamp)")
+    cursor.execute("ALTER TABLE ewcs_data_new RENAME TO ewcs_data")
+
+    invalidate_table_info(cursor.connection)
+    return not table_has_rows
+
+
+def rebuild_ewcs_data_into_fresh_file(conn, doomed):
+    """Write the trimmed ewcs_data into a fresh file at NEW_DB_PATH.
+
+    For very large tables the in-place shadow rebuild transiently doubles
+    the db file and leaves it fragmented; writing into an attached fresh
+    file is a pure sequential append instead. Every other table (and its
+    indexes) is carried over unchanged so nothing is lost when the caller
+    swaps the file in. Must be called outside any transaction; the caller
+    closes its connection and then os.replace()s NEW_DB_PATH over DB_PATH.
+    """
+    if os.path.exists(NEW_DB_PATH):
+        os.remove(NEW_DB_PATH)
+
+    cursor = conn.cursor()
+    keep = _keep_columns(cursor, doomed)
+    select_list = ", ".join(name for name, _ in keep)
+
+    cursor.execute(f"ATTACH DATABASE '{NEW_DB_PATH}' AS newdb")
+    try:
+        # the attached file is still empty, the only point where its page
+        # size can be chosen: 8K leaves mean fewer B-tree splits for these
+        # wide REAL-heavy rows, and incremental auto_vacuum keeps later
+        # DELETEs from bloating the file
+        conn.execute("PRAGMA newdb.page_size=8192")
+        conn.execute("PRAGMA newdb.auto_vacuum=INCREMENTAL")
+
+        conn.execute("BEGIN IMMEDIATE")
+
+        cursor.execute("CREATE TABLE newdb.ewcs_data (\n    "
+                       + ",\n    ".join(f"{name} {decl}" for name, decl in keep)
+                       + "\n)")
+
+        cursor.execute("SELECT MAX(id) FROM main.ewcs_data")
+        hi = cursor.fetchone()[0]
+        if hi is not None:
+            for lo in range(0, hi + 1, COPY_BATCH_SIZE):
+                cursor.execute(
+                    f"INSERT INTO newdb.ewcs_data SELECT {select_list}"
+                    " FROM main.ewcs_data WHERE id >= ? AND id < ?",
+                    (lo, lo + COPY_BATCH_SIZE))
+
+        cursor.execute("CREATE INDEX newdb.idx_ewcs_data_timestamp"
+                       " ON ewcs_data(timestamp)")
+
+        # carry the remaining tables over unchanged; INSERT ... SELECT *
+        # between identical schemas lets SQLite copy at the page level
+        cursor.execute("""
+            SELECT name, sql FROM main.sqlite_master
+            WHERE type = 'table' AND name != 'ewcs_data'
+              AND name NOT LIKE 'sqlite_%'
+        """)
+        for name, sql in cursor.fetchall():
+            conn.execute(sql.replace("CREATE TABLE ", "CREATE TABLE newdb.", 1))
+            conn.execute(f"INSERT INTO newdb.{name} SELECT * FROM main.{name}")
+            cursor.execute("""
+                SELECT sql FROM main.sqlite_master
+                WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL
+            """, (name,))
+            for (index_sql,) in cursor.fetchall():
+                conn.execute(index_sql.replace("CREATE INDEX ", "CREATE INDEX newdb.", 1))
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("DETACH DATABASE newdb")
+        invalidate_table_info(conn)
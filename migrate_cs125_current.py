@@ -0,0 +1,118 @@
+import os
+import sqlite3
+
+from migrate_common import (BIG_TABLE_ROWS, DB_PATH, NEW_DB_PATH,
+                            bulk_window_pragmas, confirm, connect_tuned,
+                            has_column, invalidate_table_info,
+                            migration_applied, parse_args,
+                            rebuild_ewcs_data_into_fresh_file,
+                            rebuild_ewcs_data_without, record_migration)
+
+MIGRATION_NAME = 'drop_cs125_current'
+
+
+def _drop_column(conn, cursor):
+    """Drop cs125_current inside the currently open transaction.
+
+    Returns True when the legacy rebuild skipped the copy because the
+    table was empty.
+    """
+    copy_skipped = False
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        # SQLite 3.35+ can drop the column in place, rewriting only the
+        # affected column data and keeping the timestamp index intact
+        cursor.execute("ALTER TABLE ewcs_data DROP COLUMN cs125_current")
+        invalidate_table_info(conn)
+    else:
+        copy_skipped = rebuild_ewcs_data_without(cursor, ['cs125_current'])
+    # recorded inside the same transaction as the drop itself
+    record_migration(conn, MIGRATION_NAME)
+    return copy_skipped
+
+
+def migrate_cs125_current(conn=None):
+    # when migrate_all passes an existing connection, the driver owns the
+    # transaction and the journal pragmas; standalone runs manage both here
+    own_conn = conn is None
+    if own_conn:
+        conn = connect_tuned()
+    cursor = conn.cursor()
+
+    try:
+        if migration_applied(conn, MIGRATION_NAME):
+            print(f"{MIGRATION_NAME} already applied, nothing to do")
+            return
+
+        # make sure the column is actually there before rebuilding anything
+        if not has_column(conn, 'ewcs_data', 'cs125_current'):
+            print("cs125_current column already removed, nothing to do")
+            return
+
+        # probe whether the doomed column ever held data; on a fresh
+        # install the whole table is usually empty and the legacy rebuild
+        # can skip the O(rows) copy entirely
+        cursor.execute("SELECT 1 FROM ewcs_data WHERE cs125_current IS NOT NULL LIMIT 1")
+        column_has_data = cursor.fetchone() is not None
+
+        if not column_has_data:
+            print("cs125_current holds no data, dropping it loses nothing")
+        copy_skipped = False
+
+        use_legacy = sqlite3.sqlite_version_info < (3, 35, 0)
+        use_fresh_file = False
+        if use_legacy and own_conn:
+            cursor.execute("SELECT COUNT(*) FROM ewcs_data")
+            use_fresh_file = cursor.fetchone()[0] > BIG_TABLE_ROWS
+
+        if use_fresh_file:
+            # huge table: rebuild into a fresh attached file as a pure
+            # sequential append, then swap it over data/ewcs.db
+            rebuild_ewcs_data_into_fresh_file(conn, ['cs125_current'])
+            conn.close()
+            os.replace(NEW_DB_PATH, DB_PATH)
+            conn = connect_tuned()
+            cursor = conn.cursor()
+            record_migration(conn, MIGRATION_NAME)
+        elif own_conn:
+            # the rebuild is destructive anyway (re-run the script on
+            # failure), so journalling is off for the bulk window unless
+            # --journal-mode says otherwise; a safe mode is restored after
+            # commit
+            bulk_window_pragmas(conn)
+            # the connection context manager commits on success and rolls
+            # back on any exception, so there is no manual error branch
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                copy_skipped = _drop_column(conn, cursor)
+            # back to a safe mode for the running application
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        else:
+            copy_skipped = _drop_column(conn, cursor)
+
+        if own_conn:
+            # refresh planner statistics so post-migration queries don't
+            # plan against stale sqlite_stat1 entries for the old table
+            conn.execute("PRAGMA optimize")
+            conn.execute("ANALYZE ewcs_data")
+
+        if copy_skipped:
+            print("ewcs_data was empty, row copy skipped")
+        print("cs125_current column removed from ewcs_data")
+
+        # verify the new schema in one round trip
+        print("New columns:", cursor.execute(
+            "SELECT group_concat(name) FROM pragma_table_info('ewcs_data')"
+        ).fetchone()[0])
+
+    finally:
+        if own_conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    args = parse_args("Remove the cs125_current column from ewcs_data")
+    if args.yes or confirm("Remove cs125_current column from ewcs_data? (y/N): "):
+        migrate_cs125_current()
+    else:
+        print("Cancelled")
@@ -0,0 +1,103 @@
+import sqlite3
+
+from migrate_common import (confirm, connect_tuned, migration_applied,
+                            parse_args, record_migration)
+
+MIGRATION_NAME = 'move_fits_images'
+
+
+def _move_fits_rows(conn, cursor):
+    """Move the cached .fits rows inside the currently open transaction."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS oasc_images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp INTEGER,
+            filename TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        # DELETE ... RETURNING locates each row once and feeds the
+        # INSERT with it, instead of one pass for the copy and a
+        # second for the delete. SQLite has no Postgres-style
+        # data-modifying CTE, so the handoff goes through Python.
+        moved = cursor.execute("""
+            DELETE FROM ewcs_images
+            WHERE id IN (SELECT id FROM fits_ids)
+            RETURNING timestamp, filename, created_at
+        """).fetchall()
+        cursor.executemany("""
+            INSERT INTO oasc_images (timestamp, filename, created_at)
+            VALUES (?, ?, ?)
+        """, moved)
+    else:
+        cursor.execute("""
+            INSERT INTO oasc_images (timestamp, filename, created_at)
+            SELECT timestamp, filename, created_at FROM ewcs_images
+            WHERE id IN (SELECT id FROM fits_ids)
+        """)
+
+        cursor.execute("DELETE FROM ewcs_images WHERE id IN (SELECT id FROM fits_ids)")
+
+    # recorded inside the same transaction as the move itself
+    record_migration(conn, MIGRATION_NAME)
+
+
+def migrate_images(conn=None):
+    # when migrate_all passes an existing connection, the driver owns the
+    # transaction; standalone runs manage it here
+    own_conn = conn is None
+    if own_conn:
+        conn = connect_tuned()
+    cursor = conn.cursor()
+
+    try:
+        if migration_applied(conn, MIGRATION_NAME):
+            print(f"{MIGRATION_NAME} already applied, nothing to do")
+            return
+
+        # the leading-% LIKE defeats any index, so every statement using it
+        # is a full scan; run that scan exactly once and cache the matching
+        # ids in a temp table (kept in RAM via temp_store=MEMORY) for the
+        # count, the INSERT and the DELETE
+        cursor.execute("DROP TABLE IF EXISTS temp.fits_ids")
+        cursor.execute("""
+            CREATE TEMP TABLE fits_ids AS
+            SELECT id FROM ewcs_images WHERE filename LIKE '%.fits'
+        """)
+        cursor.execute("SELECT COUNT(*) FROM fits_ids")
+        count = cursor.fetchone()[0]
+
+        if count == 0:
+            print("no .fits rows in ewcs_images, nothing to do")
+            return
+
+        print(f"moving {count} .fits rows from ewcs_images to oasc_images")
+
+        if own_conn:
+            # the connection context manager commits on success and rolls
+            # back on any exception, so there is no manual error branch
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                _move_fits_rows(conn, cursor)
+            # refresh planner statistics for both tables the move touched
+            conn.execute("PRAGMA optimize")
+            conn.execute("ANALYZE ewcs_images")
+            conn.execute("ANALYZE oasc_images")
+        else:
+            _move_fits_rows(conn, cursor)
+
+        print(f"moved {count} rows")
+
+    finally:
+        if own_conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    args = parse_args("Move .fits images from ewcs_images to oasc_images")
+    if args.yes or confirm("Move .fits images from ewcs_images to oasc_images? (y/N): "):
+        migrate_images()
+    else:
+        print("Cancelled")